@@ -3,19 +3,88 @@ Database Manager for Activity Tracker Calendar
 Handles all database operations for storing and retrieving activity data
 """
 
+import copy
 import json
+import mmap
 import os
+import pathlib
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
+
+# Data files live in the directory that contains the project checkout
+_BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+
+# Data files larger than this are memory-mapped when read
+_MMAP_THRESHOLD = 64 * 1024
+
+# The activity log is compacted once it outgrows the data file by this factor
+_COMPACT_RATIO = 4
+_COMPACT_MIN_BYTES = 64 * 1024
+
+
+def _loads(raw):
+    """Parse JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(bytes(raw))
+
+
+def _read_json(path):
+    """Read and parse the activities data file, memory-mapping large files"""
+    with open(path, 'rb') as f:
+        # Mapping only pays off once the file is big enough to outweigh the extra
+        # syscalls, and only orjson can parse the mapping without a copy
+        if orjson is not None and os.fstat(f.fileno()).st_size > _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return _loads(view)
+        return _loads(f.read())
+
+
+def _dumps(data, indent=False):
+    """Serialize data to compact UTF-8 JSON bytes, or indented ones if indent is True"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _date_key(date_str):
+    """Turn a YYYY-MM-DD date into a sortable YYYYMMDD integer"""
+    return int(date_str.replace("-", ""))
+
+
 class DatabaseManager:
     """Manages database operations for the Activity Tracker application"""
     
     def __init__(self, db_path=None):
         """Initialize database manager with optional custom path"""
-        self.activities_file = db_path or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
-            os.path.abspath(__file__)))), "activity_tracker_data.json")
-        self.journal_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
-            os.path.abspath(__file__)))), "journal_data.json")
+        self.activities_file = db_path or str(_BASE_DIR / "activity_tracker_data.json")
+        self.journal_file = str(_BASE_DIR / "journal_data.json")
+        
+        # Append-only log of activity changes made since the data file was last written
+        self.activities_log = os.path.splitext(self.activities_file)[0] + ".jsonl"
+        
+        # In-memory mirror of the data file plus its log, reloaded when either changes
+        self._cache = None
+        self._cache_mtime = None
+        self._acts_by_id = {}
+        self._by_date = {}
+        self._by_category = {}
+        self._sorted_keys = []
+        self._sorted_activities = []
+        
+        # Writes are deferred while inside bulk()
+        self._bulk_depth = 0
+        self._dirty = False
+        self._pending_log = []
         
         # Initialize database files if they don't exist
         self._initialize_db()
@@ -24,39 +93,253 @@ class DatabaseManager:
         """Create database files if they don't exist"""
         # Activities database
         if not os.path.exists(self.activities_file):
-            with open(self.activities_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "categories": [
-                        {"id": 1, "name": "Sport", "color": "#FF5733"},
-                        {"id": 2, "name": "Lecture", "color": "#33A8FF"},
-                        {"id": 3, "name": "Méditation", "color": "#B033FF"},
-                        {"id": 4, "name": "Travail", "color": "#33FF57"}
-                    ],
-                    "activities": []
-                }, f, ensure_ascii=False, indent=4)
+            self._write_json(self.activities_file, {
+                "categories": [
+                    {"id": 1, "name": "Sport", "color": "#FF5733"},
+                    {"id": 2, "name": "Lecture", "color": "#33A8FF"},
+                    {"id": 3, "name": "Méditation", "color": "#B033FF"},
+                    {"id": 4, "name": "Travail", "color": "#33FF57"}
+                ],
+                "activities": [],
+                "next_category_id": 5,
+                "next_activity_id": 1
+            })
+            
+            # A log left over from a deleted data file must not be replayed onto the new one
+            if os.path.exists(self.activities_log):
+                os.remove(self.activities_log)
         
         # Journal database
         if not os.path.exists(self.journal_file):
-            with open(self.journal_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "journal_entries": []
-                }, f, ensure_ascii=False, indent=4)
+            self._write_json(self.journal_file, {
+                "journal_entries": []
+            })
+    
+    def _write_json(self, path, data, indent=False):
+        """Serialize data and atomically replace path with it"""
+        buf = _dumps(data, indent)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buf)
+            # Make the data durable before the rename exposes it
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def _stamp(self):
+        """Return a value that changes whenever the data file or its log changes"""
+        # (data mtime, data size, (log mtime, log size) or None if there is no log)
+        st = os.stat(self.activities_file)
+        try:
+            log_st = os.stat(self.activities_log)
+        except FileNotFoundError:
+            return st.st_mtime_ns, st.st_size, None
+        return st.st_mtime_ns, st.st_size, (log_st.st_mtime_ns, log_st.st_size)
+    
+    def _load(self):
+        """Return the parsed activities data, re-reading the files only if they changed"""
+        # Unsaved changes from bulk() take precedence over the files on disk
+        if self._dirty or self._pending_log:
+            return self._cache
+        
+        stamp = self._stamp()
+        if self._cache is None or stamp != self._cache_mtime:
+            data = _read_json(self.activities_file)
+            
+            # Activities are kept by ID and only turned back into a list when saved
+            self._acts_by_id = {a["id"]: a for a in data.pop("activities", [])}
+            self._replay_log(data)
+            
+            # A restored or hand-edited counter must not hand out IDs already in use
+            counter = data.get("next_activity_id")
+            if counter is not None and self._acts_by_id:
+                data["next_activity_id"] = max(counter, max(self._acts_by_id) + 1)
+            self._cache = data
+            self._cache_mtime = stamp
+            self._build_indexes()
+        return self._cache
+    
+    def _replay_log(self, data):
+        """Apply the logged activity changes on top of the data file contents"""
+        if not os.path.exists(self.activities_log):
+            return
+        
+        activities = self._acts_by_id
+        
+        # Files written before the counter existed continue after their highest ID
+        counter = data.get("next_activity_id")
+        next_id = counter if counter is not None else max(activities, default=0) + 1
+        seed = next_id
+        with open(self.activities_log, 'rb') as f:
+            for line in f:
+                try:
+                    entry = _loads(line)
+                except ValueError:
+                    # A torn line from an interrupted append
+                    continue
+                
+                # Entries are idempotent, so replaying onto a newer data file is safe
+                if entry["op"] == "del":
+                    activities.pop(entry["id"], None)
+                else:
+                    activity = entry["rec"]
+                    activities[activity["id"]] = activity
+                    next_id = max(next_id, activity["id"] + 1)
+        
+        # Leave a missing counter to _next_id unless the log moved past the seed
+        if counter is not None or next_id != seed:
+            data["next_activity_id"] = next_id
+    
+    def _build_indexes(self):
+        """Index the cached activities by date, by category and in date order"""
+        activities = self._acts_by_id.values()
+        self._by_date = {}
+        self._by_category = {}
+        for activity in activities:
+            self._by_date.setdefault(activity["date"], []).append(activity)
+            self._by_category.setdefault(activity["category_id"], []).append(activity)
+        
+        # Activities sorted by date key, with the keys in a parallel list for bisect
+        dated = sorted(((_date_key(a["date"]), a) for a in activities),
+                       key=lambda item: item[0])
+        self._sorted_keys = [key for key, _ in dated]
+        self._sorted_activities = [activity for _, activity in dated]
+    
+    def _index_activity(self, activity):
+        """Add an activity to the indexes"""
+        self._by_date.setdefault(activity["date"], []).append(activity)
+        self._by_category.setdefault(activity["category_id"], []).append(activity)
+        
+        key = _date_key(activity["date"])
+        i = bisect_right(self._sorted_keys, key)
+        self._sorted_keys.insert(i, key)
+        self._sorted_activities.insert(i, activity)
+    
+    def _unindex_activity(self, activity):
+        """Remove an activity from the indexes"""
+        self._by_date[activity["date"]].remove(activity)
+        self._by_category[activity["category_id"]].remove(activity)
+        
+        key = _date_key(activity["date"])
+        for i in range(bisect_left(self._sorted_keys, key),
+                       bisect_right(self._sorted_keys, key)):
+            if self._sorted_activities[i] is activity:
+                del self._sorted_keys[i]
+                del self._sorted_activities[i]
+                break
+    
+    def _save(self):
+        """Mark the in-memory data as changed, writing it unless inside bulk()"""
+        self._dirty = True
+        if self._bulk_depth == 0:
+            self._flush()
+    
+    def _log(self, entry):
+        """Record an activity change, appending it to the log unless inside bulk()"""
+        self._pending_log.append(entry)
+        if self._bulk_depth == 0:
+            self._flush()
+    
+    def _flush(self):
+        """Write pending changes to disk"""
+        if self._dirty:
+            self._compact()
+            return
+        
+        buf = b"".join(_dumps(entry) + b"\n" for entry in self._pending_log)
+        with open(self.activities_log, 'ab+') as f:
+            # Start on a fresh line if a previous append was cut short
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    buf = b"\n" + buf
+            f.write(buf)
+        self._pending_log = []
+        self._cache_mtime = self._stamp()
+        
+        # Compact once the log outgrows the data file; it may be gone already
+        _, data_size, log_stamp = self._cache_mtime
+        if (log_stamp is not None and
+                log_stamp[1] > max(_COMPACT_RATIO * data_size, _COMPACT_MIN_BYTES)):
+            self._compact()
+    
+    def _snapshot(self):
+        """Return the cached data in its on-disk shape, with activities as a list"""
+        return dict(self._cache, activities=list(self._acts_by_id.values()))
+    
+    def _compact(self):
+        """Rewrite the data file from memory and drop the activity log"""
+        self._write_json(self.activities_file, self._snapshot())
+        if os.path.exists(self.activities_log):
+            os.remove(self.activities_log)
+        self._dirty = False
+        self._pending_log = []
+        self._cache_mtime = self._stamp()
+    
+    @contextmanager
+    def bulk(self):
+        """Defer writes until the outermost bulk() block exits"""
+        self._bulk_depth += 1
+        try:
+            yield self
+        finally:
+            self._bulk_depth -= 1
+            if self._bulk_depth == 0 and (self._dirty or self._pending_log):
+                self._flush()
+    
+    @contextmanager
+    def transaction(self):
+        """Write the changes made in the block at once, or discard them on error"""
+        saved = self._checkpoint()
+        with self.bulk():
+            try:
+                yield self
+            except BaseException:
+                self._rollback(saved)
+                raise
+    
+    def _checkpoint(self):
+        """Copy the in-memory state a transaction may change, for _rollback()"""
+        data = self._load()
+        
+        # Updates change activities in place, and log entries refer to them, so copy both
+        pending = [dict(entry, rec=dict(entry["rec"])) if "rec" in entry else entry
+                   for entry in self._pending_log]
+        return (copy.deepcopy(data),
+                {activity_id: dict(a) for activity_id, a in self._acts_by_id.items()},
+                pending,
+                self._dirty)
+    
+    def _rollback(self, saved):
+        """Restore the state saved by _checkpoint(), keeping earlier unwritten changes"""
+        self._cache, self._acts_by_id, self._pending_log, self._dirty = saved
+        self._build_indexes()
+    
+    def _next_id(self, data, counter, items):
+        """Return a new ID from the given counter and advance it"""
+        new_id = data.get(counter)
+        if new_id is None:
+            # Files written before counters existed: derive it once from the IDs
+            new_id = max((item["id"] for item in items), default=0) + 1
+        data[counter] = new_id + 1
+        return new_id
+    
+    def export_pretty(self, path):
+        """Write an indented, human-readable copy of the activities data to path"""
+        self._load()
+        self._write_json(path, self._snapshot(), indent=True)
     
     def get_categories(self):
         """Get all activity categories"""
-        with open(self.activities_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get("categories", [])
+        data = self._load()
+        return [dict(cat) for cat in data.get("categories", [])]
     
     def add_category(self, name, color):
         """Add a new activity category"""
-        with open(self.activities_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = self._load()
         
         # Generate new ID
-        new_id = 1
-        if data["categories"]:
-            new_id = max(cat["id"] for cat in data["categories"]) + 1
+        new_id = self._next_id(data, "next_category_id", data["categories"])
         
         # Add new category
         data["categories"].append({
@@ -66,99 +349,134 @@ class DatabaseManager:
         })
         
         # Save changes
-        with open(self.activities_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        self._save()
         
         return new_id
     
     def delete_category(self, category_id):
         """Delete a category by ID"""
-        with open(self.activities_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = self._load()
         
         # Filter out the category to delete
         data["categories"] = [c for c in data["categories"] if c["id"] != category_id]
         
         # Save changes
-        with open(self.activities_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        self._save()
         
         return True
     
     def get_activities(self, start_date=None, end_date=None, category_id=None):
-        """Get activities with optional filters"""
-        with open(self.activities_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        """Get activities with optional filters, as copies of the stored records"""
+        self._load()
         
-        activities = data.get("activities", [])
+        # Single-day and category-only queries are served from the indexes
+        if start_date and start_date == end_date:
+            activities = self._by_date.get(start_date, [])
+        elif start_date or end_date:
+            # Ranges are sliced out of the date-sorted index
+            low = bisect_left(self._sorted_keys, _date_key(start_date)) if start_date else 0
+            high = (bisect_right(self._sorted_keys, _date_key(end_date))
+                    if end_date else len(self._sorted_keys))
+            activities = self._sorted_activities[low:high]
+        elif category_id is not None:
+            return [dict(a) for a in self._by_category.get(category_id, [])]
+        else:
+            activities = self._acts_by_id.values()
         
-        # Apply filters
-        if start_date:
-            activities = [a for a in activities if a["date"] >= start_date]
-        if end_date:
-            activities = [a for a in activities if a["date"] <= end_date]
+        # Apply category filter
         if category_id is not None:
             activities = [a for a in activities if a["category_id"] == category_id]
         
-        return activities
+        # Callers get copies so editing a record can't corrupt the cache and indexes
+        return [dict(a) for a in activities]
+    
+    def get_activity(self, activity_id):
+        """Get a single activity by ID, or None if it doesn't exist"""
+        self._load()
+        activity = self._acts_by_id.get(activity_id)
+        return dict(activity) if activity is not None else None
+    
+    def iter_activities_with_category(self, unknown="Inconnu"):
+        """Yield (date, title, category name, duration, notes) rows for every activity"""
+        self._load()
+        names = {cat["id"]: cat["name"] for cat in self._cache.get("categories", [])}
+        for activity in self._acts_by_id.values():
+            yield (activity["date"],
+                   activity["title"],
+                   names.get(activity["category_id"], unknown),
+                   activity["duration"],
+                   activity.get("notes", ""))
+    
+    def count_category_activities(self, category_id):
+        """Get the number of activities that use a category"""
+        self._load()
+        return len(self._by_category.get(category_id, []))
+    
+    def get_category_stats(self):
+        """Get the number of activities and their total duration per category"""
+        self._load()
+        return {
+            cat_id: {"count": len(acts), "duration": sum(a["duration"] for a in acts)}
+            for cat_id, acts in self._by_category.items() if acts
+        }
     
     def add_activity(self, title, category_id, date, duration, notes=""):
         """Add a new activity entry"""
-        with open(self.activities_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = self._load()
         
         # Generate new ID
-        new_id = 1
-        if data["activities"]:
-            new_id = max(act["id"] for act in data["activities"]) + 1
+        new_id = self._next_id(data, "next_activity_id", self._acts_by_id.values())
         
         # Add new activity
-        data["activities"].append({
+        activity = {
             "id": new_id,
             "title": title,
             "category_id": category_id,
             "date": date,
             "duration": duration,
             "notes": notes
-        })
+        }
+        self._acts_by_id[new_id] = activity
+        self._index_activity(activity)
         
         # Save changes
-        with open(self.activities_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        self._log({"op": "add", "rec": activity})
         
         return new_id
     
     def update_activity(self, activity_id, title, category_id, duration, notes=""):
         """Update an existing activity"""
-        with open(self.activities_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        self._load()
         
         # Find activity by ID
-        for activity in data["activities"]:
-            if activity["id"] == activity_id:
-                # Update fields
-                activity["title"] = title
-                activity["category_id"] = category_id
-                activity["duration"] = duration
-                activity["notes"] = notes
-                break
-        
-        # Save changes
-        with open(self.activities_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        activity = self._acts_by_id.get(activity_id)
+        if activity is not None:
+            # Move the activity to its new category index
+            if activity["category_id"] != category_id:
+                self._by_category[activity["category_id"]].remove(activity)
+                self._by_category.setdefault(category_id, []).append(activity)
+            
+            # Update fields
+            activity["title"] = title
+            activity["category_id"] = category_id
+            activity["duration"] = duration
+            activity["notes"] = notes
+            
+            # Save changes
+            self._log({"op": "update", "rec": activity})
         
         return True
     
     def delete_activity(self, activity_id):
         """Delete an activity by ID"""
-        with open(self.activities_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Filter out the activity to delete
-        data["activities"] = [a for a in data["activities"] if a["id"] != activity_id]
+        self._load()
         
-        # Save changes
-        with open(self.activities_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        # Remove the activity and its index entries
+        activity = self._acts_by_id.pop(activity_id, None)
+        if activity is not None:
+            self._unindex_activity(activity)
+            
+            # Save changes
+            self._log({"op": "del", "id": activity_id})
         
         return True
\ No newline at end of file
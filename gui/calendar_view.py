@@ -18,10 +18,23 @@ class CalendarView(ttk.Frame):
         self.today = datetime.now()
         self.current_date = datetime.now()
         self.selected_date = None
+        self._selected_index = None
         self.activity_callback = None
+        self._cal = calendar.Calendar(firstweekday=0)
+        self._pending_id = None
         
-        # Configure style
-        self.style = ttk.Style()
+        # Configure style; ttk styles are global to the Tk interpreter, so they are
+        # registered only if this view's interpreter doesn't have them yet
+        self.style = ttk.Style(self)
+        if not self.style.lookup('CalendarDay.TLabel', 'font'):
+            self._register_styles()
+        
+        # Create calendar layout
+        self._create_widgets()
+        self._update_calendar()
+    
+    def _register_styles(self):
+        """Register the ttk styles used by calendar views"""
         self.style.configure('Calendar.TFrame', background='white')
         self.style.configure('CalendarHeader.TLabel', 
                             font=('Arial', 12, 'bold'),
@@ -41,10 +54,6 @@ class CalendarView(ttk.Frame):
                             background='#3366CC',
                             foreground='white',
                             padding=2)
-        
-        # Create calendar layout
-        self._create_widgets()
-        self._update_calendar()
     
     def _create_widgets(self):
         """Create calendar UI components"""
@@ -79,6 +88,11 @@ class CalendarView(ttk.Frame):
         self.calendar_frame = ttk.Frame(self, style='Calendar.TFrame')
         self.calendar_frame.pack(fill='both', expand=True, padx=5, pady=5)
         
+        # Day labels share one click binding through a per-view bind tag
+        self._day_tag = f"DayLabel{id(self)}"
+        self.calendar_frame.bind_class(self._day_tag, '<Button-1>', self._dispatch_click)
+        self._widget_to_index = {}
+        
         # Create 6 rows x 7 columns grid for calendar days
         self.day_labels = []
         for row in range(6):
@@ -90,6 +104,8 @@ class CalendarView(ttk.Frame):
                 day_label = ttk.Label(frame, text="", anchor='nw', 
                                      style='CalendarDay.TLabel')
                 day_label.pack(side='top', fill='both', expand=True)
+                day_label.bindtags((self._day_tag,) + day_label.bindtags())
+                self._widget_to_index[str(day_label)] = len(self.day_labels)
                 
                 # Activity indicator frame
                 indicator_frame = ttk.Frame(frame)
@@ -99,7 +115,10 @@ class CalendarView(ttk.Frame):
                     'frame': frame,
                     'label': day_label,
                     'indicator': indicator_frame,
-                    'date': None
+                    'indicator_pool': [],
+                    'indicator_colors': (),
+                    'date': None,
+                    'date_str': None
                 })
         
         # Make grid cells expandable
@@ -110,88 +129,109 @@ class CalendarView(ttk.Frame):
     
     def _update_calendar(self):
         """Update calendar display for current month"""
+        # Drop indicators still queued for the previously shown month
+        if self._pending_id is not None:
+            self.after_cancel(self._pending_id)
+            self._pending_id = None
+        
         # Update header with month and year
         month_name = self.current_date.strftime("%B %Y")
         self.header_label.config(text=month_name.capitalize())
         
-        # Get calendar for current month
-        cal = calendar.monthcalendar(self.current_date.year, self.current_date.month)
+        year, month = self.current_date.year, self.current_date.month
         
-        # Clear previous indicators
-        for day_item in self.day_labels:
-            for widget in day_item['indicator'].winfo_children():
-                widget.destroy()
-            day_item['label'].config(text="", style='CalendarDay.TLabel')
-            day_item['date'] = None
-        
-        # Fill calendar with days
-        day_index = 0
-        for week in cal:
-            for day in week:
-                day_item = self.day_labels[day_index]
-                
-                if day != 0:
-                    # Set date for this cell
-                    cell_date = datetime(self.current_date.year, 
-                                        self.current_date.month, day)
-                    day_item['date'] = cell_date
-                    day_item['label'].config(text=str(day))
-                    
-                    # Check if this is today
-                    if (cell_date.year == self.today.year and 
-                        cell_date.month == self.today.month and 
-                        cell_date.day == self.today.day):
-                        day_item['label'].config(style='CalendarToday.TLabel')
-                    
-                    # Check if this is selected date
-                    if (self.selected_date and
-                        cell_date.year == self.selected_date.year and 
-                        cell_date.month == self.selected_date.month and 
-                        cell_date.day == self.selected_date.day):
-                        day_item['label'].config(style='CalendarSelected.TLabel')
-                    
-                    # Add click event
-                    day_item['label'].bind('<Button-1>', 
-                                         lambda e, d=cell_date: self._on_date_click(d))
-                    
-                    # Add activity indicators
-                    self._add_activity_indicators(day_item)
-                
-                day_index += 1
-    
-    def _add_activity_indicators(self, day_item):
-        """Add colored indicators for activities on this day"""
-        if not day_item['date']:
-            return
+        # ISO date strings used to spot today and the selected date
+        today_str = self.today.date().isoformat()
+        selected_str = (self.selected_date.isoformat()
+                        if self.selected_date else None)
+        
+        # Fill calendar with days, leaving days of adjacent months blank
+        dates = list(self._cal.itermonthdates(year, month))
+        self._selected_index = None
+        for day_index, day_item in enumerate(self.day_labels):
+            cell_date = dates[day_index] if day_index < len(dates) else None
+            
+            if cell_date is None or cell_date.month != month:
+                day_item['label'].config(text="", style='CalendarDay.TLabel')
+                day_item['date'] = None
+                day_item['date_str'] = None
+                self._show_indicators(day_item, ())
+                continue
             
-        # Format date for database query
-        date_str = day_item['date'].strftime("%Y-%m-%d")
+            # Set date for this cell
+            date_str = cell_date.isoformat()
+            day_item['date'] = cell_date
+            day_item['date_str'] = date_str
+            
+            # Pick the final style so the label is configured only once
+            if date_str == selected_str:
+                style = 'CalendarSelected.TLabel'
+                self._selected_index = day_index
+            elif date_str == today_str:
+                style = 'CalendarToday.TLabel'
+            else:
+                style = 'CalendarDay.TLabel'
+            day_item['label'].config(text=str(cell_date.day), style=style)
+        
+        # Let the grid paint first, then add activity indicators when Tk is idle
+        self._pending_id = self.after_idle(self._render_all_indicators)
+    
+    def _render_all_indicators(self):
+        """Add activity indicators to every day of the displayed month"""
+        self._pending_id = None
+        year, month = self.current_date.year, self.current_date.month
         
-        # Get activities for this day
+        # Fetch the whole month's activities and the categories once
+        last_day = calendar.monthrange(year, month)[1]
         activities = self.db_manager.get_activities(
-            start_date=date_str, 
-            end_date=date_str
+            start_date=f"{year:04d}-{month:02d}-01",
+            end_date=f"{year:04d}-{month:02d}-{last_day:02d}"
         )
-        
-        # Get categories for color mapping
+        activities_by_day = {}
+        for activity in activities:
+            activities_by_day.setdefault(activity["date"], []).append(activity)
         categories = {cat["id"]: cat for cat in self.db_manager.get_categories()}
         
-        # Group activities by category
-        by_category = {}
+        for day_item in self.day_labels:
+            if day_item['date'] is not None:
+                self._add_activity_indicators(
+                    day_item,
+                    activities_by_day.get(day_item['date_str'], []),
+                    categories
+                )
+    
+    def _add_activity_indicators(self, day_item, activities, categories):
+        """Add colored indicators for the given activities on this day"""
+        # One indicator per category, in order of first appearance
+        colors = []
+        seen = set()
         for activity in activities:
             cat_id = activity["category_id"]
-            if cat_id not in by_category:
-                by_category[cat_id] = []
-            by_category[cat_id].append(activity)
-        
-        # Add indicator for each category
-        for cat_id, acts in by_category.items():
-            if cat_id in categories:
-                color = categories[cat_id]["color"]
-                indicator = tk.Frame(day_item['indicator'], 
-                                    background=color,
-                                    width=8, height=4)
+            if cat_id not in seen and cat_id in categories:
+                seen.add(cat_id)
+                colors.append(categories[cat_id]["color"])
+        
+        self._show_indicators(day_item, tuple(colors))
+    
+    def _show_indicators(self, day_item, colors):
+        """Show one indicator per color, reusing the cell's indicator frames"""
+        # Nothing to do if the cell already shows these colors
+        if colors == day_item['indicator_colors']:
+            return
+        
+        # Grow the pool of indicator frames as needed
+        pool = day_item['indicator_pool']
+        while len(pool) < len(colors):
+            pool.append(tk.Frame(day_item['indicator'], width=8, height=4))
+        
+        for i, indicator in enumerate(pool):
+            if i < len(colors):
+                indicator.config(background=colors[i])
                 indicator.pack(side='left', padx=1)
+            else:
+                indicator.pack_forget()
+        
+        day_item['indicator_colors'] = colors
     
     def _prev_month(self):
         """Go to previous month"""
@@ -217,10 +257,28 @@ class CalendarView(ttk.Frame):
         self.current_date = datetime(year, month, 1)
         self._update_calendar()
     
+    def _dispatch_click(self, event):
+        """Forward a click on a day label to _on_date_click"""
+        index = self._widget_to_index.get(str(event.widget))
+        if index is not None and self.day_labels[index]['date'] is not None:
+            self._on_date_click(self.day_labels[index]['date'])
+    
     def _on_date_click(self, date):
         """Handle date selection"""
         self.selected_date = date
-        self._update_calendar()
+        
+        # Only the previously and newly selected cells need restyling
+        if self._selected_index is not None:
+            previous = self.day_labels[self._selected_index]
+            if previous['date_str'] == self.today.date().isoformat():
+                previous['label'].config(style='CalendarToday.TLabel')
+            else:
+                previous['label'].config(style='CalendarDay.TLabel')
+        
+        # Cells start on Monday, so the month's first weekday is the offset
+        self._selected_index = date.replace(day=1).weekday() + date.day - 1
+        self.day_labels[self._selected_index]['label'].config(
+            style='CalendarSelected.TLabel')
         
         # Call callback if registered
         if self.activity_callback:
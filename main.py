@@ -12,7 +12,14 @@ import os
 # Import local modules using absolute imports
 from database.db_manager import DatabaseManager
 from gui.calendar_view import CalendarView
-from utils.validators import *
+from utils.validators import sanitize_input, validate_color_hex
+
+# Charts in the statistics dialog need matplotlib, which is optional
+try:
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+except ImportError:
+    plt = None
 
 
 class MainWindow:
@@ -27,6 +34,19 @@ class MainWindow:
         # Initialize database
         self.db = DatabaseManager()
         
+        # Statistics figures, created on first use and redrawn on later opens
+        self._stats_fig_pie = None
+        self._stats_fig_bar = None
+        
+        # Dialogs are built once, then hidden and shown again
+        self._activity_form = None
+        self._categories_dialog = None
+        self._reload_category_list = None
+        self._preview_after = None
+        
+        # Activities shown in the list, by ID, so editing needs no lookup
+        self._activity_cache = {}
+        
         # Configure style
         self.style = ttk.Style()
         self.style.theme_use('clam')
@@ -126,41 +146,54 @@ class MainWindow:
     
     def _load_activities(self, date):
         """Load activities for selected date"""
-        # Clear current list
-        for item in self.activities_list.get_children():
-            self.activities_list.delete(item)
-        
         # Format date for database query
-        date_str = date.strftime("%Y-%m-%d")
+        date_str = date.isoformat()
         
         # Get activities for this day
         activities = self.db.get_activities(start_date=date_str, end_date=date_str)
         
-        # Add to list
+        # Build all rows before touching the widget
+        rows = []
+        category_map = self.category_map
+        self._activity_cache = {activity["id"]: activity for activity in activities}
         for activity in activities:
-            category_name = "Inconnu"
-            if activity["category_id"] in self.category_map:
-                category_name = self.category_map[activity["category_id"]]["name"]
-            
-            self.activities_list.insert('', 'end', 
-                                       values=(activity["title"], 
-                                              category_name, 
-                                              activity["duration"]),
-                                       tags=(str(activity["id"]),))
+            cat = category_map.get(activity["category_id"])
+            category_name = cat["name"] if cat else "Inconnu"
+            
+            rows.append(((activity["title"], category_name, activity["duration"]),
+                         (str(activity["id"]),)))
+        
+        # Clear current list in a single call
+        children = self.activities_list.get_children()
+        if children:
+            self.activities_list.delete(*children)
+        
+        # Add to list
+        for values, tags in rows:
+            self.activities_list.insert('', 'end', values=values, tags=tags)
     
-    def _add_activity(self):
-        """Add new activity"""
-        # Check if a date is selected
-        if not hasattr(self, 'selected_date') or not self.selected_date:
-            messagebox.showwarning("Warning", "Please select a date first.")
-            return
+    def _show_dialog(self, dialog):
+        """Show a reusable dialog and make it modal"""
+        dialog.deiconify()
+        dialog.lift()
+        dialog.grab_set()
+    
+    def _hide_dialog(self, dialog):
+        """Hide a reusable dialog instead of destroying it"""
+        dialog.grab_release()
+        dialog.withdraw()
+    
+    def _get_activity_form(self):
+        """Return the add/edit activity dialog, building it on first use"""
+        form = self._activity_form
+        if form is not None and form['dialog'].winfo_exists():
+            return form
         
         # Create activity dialog
         dialog = tk.Toplevel(self.root)
-        dialog.title("Add an activity")
         dialog.geometry("400x300")
         dialog.transient(self.root)
-        dialog.grab_set()
+        dialog.protocol("WM_DELETE_WINDOW", lambda: self._hide_dialog(dialog))
         
         # Form fields
         ttk.Label(dialog, text="Title:").grid(row=0, column=0, sticky=tk.W, padx=10, pady=5)
@@ -172,12 +205,6 @@ class MainWindow:
         category_cb = ttk.Combobox(dialog, textvariable=category_var, width=28)
         category_cb.grid(row=1, column=1, padx=10, pady=5)
         
-        # Fill categories dropdown
-        categories = self.db.get_categories()
-        category_cb['values'] = [cat["name"] for cat in categories]
-        if categories:
-            category_cb.current(0)
-        
         ttk.Label(dialog, text="Duration (minutes):").grid(row=2, column=0, sticky=tk.W, padx=10, pady=5)
         duration_var = tk.StringVar()
         ttk.Entry(dialog, textvariable=duration_var, width=10).grid(row=2, column=1, sticky=tk.W, padx=10, pady=5)
@@ -186,16 +213,61 @@ class MainWindow:
         notes_text = scrolledtext.ScrolledText(dialog, width=30, height=5)
         notes_text.grid(row=3, column=1, padx=10, pady=5)
         
+        # Save button, its command is set each time the dialog is opened
+        save_btn = ttk.Button(dialog, text="Save")
+        save_btn.grid(row=4, column=1, sticky=tk.E, padx=10, pady=10)
+        
+        self._activity_form = {
+            'dialog': dialog,
+            'title': title_var,
+            'category': category_var,
+            'category_cb': category_cb,
+            'duration': duration_var,
+            'notes': notes_text,
+            'save': save_btn
+        }
+        return self._activity_form
+    
+    def _open_activity_form(self, dialog_title, activity, on_save):
+        """Show the activity dialog filled from activity, or blank if it is None"""
+        form = self._get_activity_form()
+        form['dialog'].title(dialog_title)
+        
+        # Fill categories dropdown
+        categories = self.categories
+        # Names aren't unique, so the first category with a name wins
+        name_to_id = {cat["name"]: cat["id"] for cat in reversed(categories)}
+        category_cb = form['category_cb']
+        category_cb['values'] = [cat["name"] for cat in categories]
+        form['category'].set("")
+        
+        # Set current category, or the first one for a new activity
+        if activity is None:
+            if categories:
+                category_cb.current(0)
+        else:
+            for i, cat in enumerate(categories):
+                if cat["id"] == activity["category_id"]:
+                    category_cb.current(i)
+                    break
+        
+        # Reset the other fields
+        form['title'].set(activity["title"] if activity else "")
+        form['duration'].set(str(activity["duration"]) if activity else "")
+        form['notes'].delete("1.0", tk.END)
+        if activity:
+            form['notes'].insert("1.0", activity.get("notes", ""))
+        
         # Save button
         def save_activity():
             # Validate inputs
-            title = sanitize_input(title_var.get())
+            title = sanitize_input(form['title'].get())
             if not title:
                 messagebox.showwarning("Error", "Title is required.")
                 return
             
             try:
-                duration = int(duration_var.get())
+                duration = int(form['duration'].get())
                 if duration <= 0:
                     raise ValueError()
             except ValueError:
@@ -203,37 +275,42 @@ class MainWindow:
                 return
             
             # Get category ID
-            cat_name = category_var.get()
-            cat_id = None
-            for cat in categories:
-                if cat["name"] == cat_name:
-                    cat_id = cat["id"]
-                    break
+            cat_id = name_to_id.get(form['category'].get())
             
             if cat_id is None:
                 messagebox.showwarning("Error", "Invalid category.")
                 return
             
-            # Format date
-            date_str = self.selected_date.strftime("%Y-%m-%d")
-            
-            # Add activity
-            self.db.add_activity(
-                title=title,
-                category_id=cat_id,
-                date=date_str,
-                duration=duration,
-                notes=notes_text.get("1.0", tk.END).strip()
-            )
+            # Add or update activity
+            on_save(title, cat_id, duration, form['notes'].get("1.0", tk.END).strip())
             
             # Refresh view
             self._load_activities(self.selected_date)
             self.calendar.refresh()
             
             # Close dialog
-            dialog.destroy()
+            self._hide_dialog(form['dialog'])
         
-        ttk.Button(dialog, text="Save", command=save_activity).grid(row=4, column=1, sticky=tk.E, padx=10, pady=10)
+        form['save'].config(command=save_activity)
+        self._show_dialog(form['dialog'])
+    
+    def _add_activity(self):
+        """Add new activity"""
+        # Check if a date is selected
+        if not hasattr(self, 'selected_date') or not self.selected_date:
+            messagebox.showwarning("Warning", "Please select a date first.")
+            return
+        
+        def add(title, cat_id, duration, notes):
+            self.db.add_activity(
+                title=title,
+                category_id=cat_id,
+                date=self.selected_date.isoformat(),
+                duration=duration,
+                notes=notes
+            )
+        
+        self._open_activity_form("Add an activity", None, add)
     
     def _edit_activity(self):
         """Edit selected activity"""
@@ -247,95 +324,23 @@ class MainWindow:
         selected_item = selected_items[0]
         activity_id = int(self.activities_list.item(selected_item, "tags")[0])
         
-        # Get activity data
-        activities = self.db.get_activities()
-        activity = next((a for a in activities if a["id"] == activity_id), None)
+        # Get activity data, from the loaded list when possible
+        activity = self._activity_cache.get(activity_id) or self.db.get_activity(activity_id)
         
         if not activity:
             messagebox.showerror("Error", "Activity not found.")
             return
         
-        # Create edit dialog
-        dialog = tk.Toplevel(self.root)
-        dialog.title("Edit activity")
-        dialog.geometry("400x300")
-        dialog.transient(self.root)
-        dialog.grab_set()
-        
-        # Form fields
-        ttk.Label(dialog, text="Title:").grid(row=0, column=0, sticky=tk.W, padx=10, pady=5)
-        title_var = tk.StringVar(value=activity["title"])
-        ttk.Entry(dialog, textvariable=title_var, width=30).grid(row=0, column=1, padx=10, pady=5)
-        
-        ttk.Label(dialog, text="Category:").grid(row=1, column=0, sticky=tk.W, padx=10, pady=5)
-        category_var = tk.StringVar()
-        category_cb = ttk.Combobox(dialog, textvariable=category_var, width=28)
-        category_cb.grid(row=1, column=1, padx=10, pady=5)
-        
-        # Fill categories dropdown
-        categories = self.db.get_categories()
-        category_cb['values'] = [cat["name"] for cat in categories]
-        
-        # Set current category
-        for i, cat in enumerate(categories):
-            if cat["id"] == activity["category_id"]:
-                category_cb.current(i)
-                break
-        
-        ttk.Label(dialog, text="Duration (minutes):").grid(row=2, column=0, sticky=tk.W, padx=10, pady=5)
-        duration_var = tk.StringVar(value=str(activity["duration"]))
-        ttk.Entry(dialog, textvariable=duration_var, width=10).grid(row=2, column=1, sticky=tk.W, padx=10, pady=5)
-        
-        ttk.Label(dialog, text="Notes:").grid(row=3, column=0, sticky=tk.NW, padx=10, pady=5)
-        notes_text = scrolledtext.ScrolledText(dialog, width=30, height=5)
-        notes_text.grid(row=3, column=1, padx=10, pady=5)
-        notes_text.insert("1.0", activity.get("notes", ""))
-        
-        # Save button
-        def save_activity():
-            # Validate inputs
-            title = sanitize_input(title_var.get())
-            if not title:
-                messagebox.showwarning("Error", "Title is required.")
-                return
-            
-            try:
-                duration = int(duration_var.get())
-                if duration <= 0:
-                    raise ValueError()
-            except ValueError:
-                messagebox.showwarning("Error", "Duration must be a positive number.")
-                return
-            
-            # Get category ID
-            cat_name = category_var.get()
-            cat_id = None
-            for cat in categories:
-                if cat["name"] == cat_name:
-                    cat_id = cat["id"]
-                    break
-            
-            if cat_id is None:
-                messagebox.showwarning("Error", "Invalid category.")
-                return
-            
-            # Update activity
+        def update(title, cat_id, duration, notes):
             self.db.update_activity(
                 activity_id=activity_id,
                 title=title,
                 category_id=cat_id,
                 duration=duration,
-                notes=notes_text.get("1.0", tk.END).strip()
+                notes=notes
             )
-            
-            # Refresh view
-            self._load_activities(self.selected_date)
-            self.calendar.refresh()
-            
-            # Close dialog
-            dialog.destroy()
         
-        ttk.Button(dialog, text="Save", command=save_activity).grid(row=4, column=1, sticky=tk.E, padx=10, pady=10)
+        self._open_activity_form("Edit activity", activity, update)
     
     def _delete_activity(self):
         """Delete selected activity"""
@@ -360,12 +365,21 @@ class MainWindow:
     
     def _manage_categories(self):
         """Open category management dialog"""
+        dialog = self._categories_dialog
+        if dialog is None or not dialog.winfo_exists():
+            dialog = self._build_categories_dialog()
+        else:
+            self._reload_category_list()
+        self._show_dialog(dialog)
+    
+    def _build_categories_dialog(self):
+        """Build the category management dialog once; it is hidden on close"""
         # Create category management dialog
         dialog = tk.Toplevel(self.root)
         dialog.title("Category Management")
         dialog.geometry("500x400")
         dialog.transient(self.root)
-        dialog.grab_set()
+        dialog.protocol("WM_DELETE_WINDOW", lambda: self._hide_dialog(dialog))
         
         # Categories list
         ttk.Label(dialog, text="Existing categories:", font=('Arial', 11)).grid(row=0, column=0, sticky=tk.W, padx=10, pady=5)
@@ -388,19 +402,22 @@ class MainWindow:
         
         # Load categories
         def load_categories():
-            # Clear current list
-            for item in cat_tree.get_children():
-                cat_tree.delete(item)
+            # Clear current list in a single call
+            children = cat_tree.get_children()
+            if children:
+                cat_tree.delete(*children)
             
             # Get categories
-            categories = self.db.get_categories()
+            categories = self.categories
             
-            # Add to list
+            # Add color preview, configuring one tag per distinct color
+            for color in {cat["color"] for cat in categories}:
+                cat_tree.tag_configure(f"bg_{color}", background=color)
+            
+            # Add to list; the first tag holds the category ID
             for cat in categories:
-                cat_tree.insert('', 'end', values=(cat["name"], cat["color"]), tags=(str(cat["id"]),))
-                
-                # Add color preview
-                cat_tree.tag_configure(str(cat["id"]), background=cat["color"])
+                cat_tree.insert('', 'end', values=(cat["name"], cat["color"]),
+                                tags=(str(cat["id"]), f"bg_{cat['color']}"))
         
         # Load initial categories
         load_categories()
@@ -422,15 +439,21 @@ class MainWindow:
         color_preview = tk.Canvas(add_frame, width=20, height=20, bg=color_var.get())
         color_preview.grid(row=0, column=4, padx=5, pady=5)
         
-        # Update color preview when color changes
-        def update_preview(*args):
+        # Update color preview once typing pauses, not on every keystroke
+        def apply_preview():
+            self._preview_after = None
             try:
                 color = color_var.get()
-                if validate_hex_color(color):
+                if validate_color_hex(color):
                     color_preview.config(bg=color)
             except:
                 pass
         
+        def update_preview(*args):
+            if self._preview_after is not None:
+                dialog.after_cancel(self._preview_after)
+            self._preview_after = dialog.after(100, apply_preview)
+        
         color_var.trace("w", update_preview)
         
         # Add category button
@@ -442,14 +465,15 @@ class MainWindow:
                 messagebox.showwarning("Error", "Category name is required.")
                 return
                 
-            if not validate_hex_color(color):
+            if not validate_color_hex(color):
                 messagebox.showwarning("Error", "Color must be in hexadecimal format (e.g., #FF5733).")
                 return
             
             # Add category
             self.db.add_category(name, color)
             
-            # Refresh list
+            # Refresh cached categories and list
+            self._load_categories()
             load_categories()
             
             # Clear inputs
@@ -458,7 +482,6 @@ class MainWindow:
             update_preview()
             
             # Refresh main window
-            self._load_categories()
             self.calendar.refresh()
             
             messagebox.showinfo("Success", "Category added successfully.")
@@ -476,10 +499,10 @@ class MainWindow:
             cat_id = int(cat_tree.item(selected[0], "tags")[0])
             
             # Check if category is used
-            activities = self.db.get_activities(category_id=cat_id)
-            if activities:
+            usage = self.db.count_category_activities(cat_id)
+            if usage:
                 messagebox.showwarning("Attention", 
-                                     f"Cette catégorie est utilisée par {len(activities)} activité(s).\n"
+                                     f"Cette catégorie est utilisée par {usage} activité(s).\n"
                                      "Veuillez d'abord supprimer ou modifier ces activités.")
                 return
             
@@ -488,11 +511,11 @@ class MainWindow:
                 # Delete category
                 self.db.delete_category(cat_id)
                 
-                # Refresh list
+                # Refresh cached categories and list
+                self._load_categories()
                 load_categories()
                 
                 # Refresh main window
-                self._load_categories()
                 self.calendar.refresh()
         
         # Buttons frame
@@ -500,15 +523,15 @@ class MainWindow:
         btn_frame.grid(row=3, column=0, columnspan=3, padx=10, pady=10, sticky=tk.E)
         
         ttk.Button(btn_frame, text="Delete", command=delete_category).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Close", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Close",
+                   command=lambda: self._hide_dialog(dialog)).pack(side=tk.LEFT, padx=5)
+        
+        self._categories_dialog = dialog
+        self._reload_category_list = load_categories
+        return dialog
     
     def _show_statistics(self):
         """Show activity statistics"""
-        # Import matplotlib
-        import matplotlib.pyplot as plt
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-        import numpy as np
-        
         # Create statistics dialog
         dialog = tk.Toplevel(self.root)
         dialog.title("Activity Statistics")
@@ -516,10 +539,7 @@ class MainWindow:
         dialog.transient(self.root)
         dialog.grab_set()
         
-        # Get all activities
-        activities = self.db.get_activities()
-        categories = self.db.get_categories()
-        cat_map = {cat["id"]: cat for cat in categories}
+        cat_map = self.category_map
         
         # Create notebook for tabs
         notebook = ttk.Notebook(dialog)
@@ -529,18 +549,10 @@ class MainWindow:
         summary_frame = ttk.Frame(notebook)
         notebook.add(summary_frame, text="Summary")
         
-        # Calculate summary statistics
-        total_activities = len(activities)
-        total_duration = sum(act["duration"] for act in activities)
-        
-        # Group by category
-        cat_stats = {}
-        for act in activities:
-            cat_id = act["category_id"]
-            if cat_id not in cat_stats:
-                cat_stats[cat_id] = {"count": 0, "duration": 0}
-            cat_stats[cat_id]["count"] += 1
-            cat_stats[cat_id]["duration"] += act["duration"]
+        # Calculate summary statistics, grouped by category, and total them
+        cat_stats = self.db.get_category_stats()
+        total_activities = sum(stats["count"] for stats in cat_stats.values())
+        total_duration = sum(stats["duration"] for stats in cat_stats.values())
         
         # Display summary
         ttk.Label(summary_frame, text="Global Statistics", font=('Arial', 12, 'bold')).pack(pady=10)
@@ -550,9 +562,8 @@ class MainWindow:
         summary_text += "Distribution by category:\n"
         
         for cat_id, stats in cat_stats.items():
-            cat_name = "Unknown"
-            if cat_id in cat_map:
-                cat_name = cat_map[cat_id]["name"]
+            cat = cat_map.get(cat_id)
+            cat_name = cat["name"] if cat else "Unknown"
             
             percent = (stats["duration"] / total_duration * 100) if total_duration > 0 else 0
             summary_text += f"- {cat_name}: {stats['count']} activities, {stats['duration']} minutes ({percent:.1f}%)\n"
@@ -566,9 +577,14 @@ class MainWindow:
         pie_frame = ttk.Frame(notebook)
         notebook.add(pie_frame, text="Pie Chart")
         
-        if total_duration > 0:
-            # Create figure for pie chart
-            fig_pie = plt.Figure(figsize=(6, 5))
+        if plt is None:
+            ttk.Label(pie_frame, text="matplotlib n'est pas installé").pack(pady=50)
+        elif total_duration > 0:
+            # Reuse the figure for the pie chart
+            if self._stats_fig_pie is None:
+                self._stats_fig_pie = plt.Figure(figsize=(6, 5))
+            fig_pie = self._stats_fig_pie
+            fig_pie.clear()
             ax_pie = fig_pie.add_subplot(111)
             
             # Prepare data for pie chart
@@ -577,11 +593,9 @@ class MainWindow:
             colors = []
             
             for cat_id, stats in cat_stats.items():
-                cat_name = "Unknown"
-                cat_color = "#CCCCCC"
-                if cat_id in cat_map:
-                    cat_name = cat_map[cat_id]["name"]
-                    cat_color = cat_map[cat_id]["color"]
+                cat = cat_map.get(cat_id)
+                cat_name = cat["name"] if cat else "Unknown"
+                cat_color = cat["color"] if cat else "#CCCCCC"
                 
                 labels.append(cat_name)
                 sizes.append(stats["duration"])
@@ -618,9 +632,14 @@ class MainWindow:
         bar_frame = ttk.Frame(notebook)
         notebook.add(bar_frame, text="Histogramme")
         
-        if total_activities > 0:
-            # Create figure for bar chart
-            fig_bar = plt.Figure(figsize=(6, 5))
+        if plt is None:
+            ttk.Label(bar_frame, text="matplotlib n'est pas installé").pack(pady=50)
+        elif total_activities > 0:
+            # Reuse the figure for the bar chart
+            if self._stats_fig_bar is None:
+                self._stats_fig_bar = plt.Figure(figsize=(6, 5))
+            fig_bar = self._stats_fig_bar
+            fig_bar.clear()
             ax_bar = fig_bar.add_subplot(111)
             
             # Prepare data for bar chart
@@ -629,11 +648,9 @@ class MainWindow:
             bar_colors = []
             
             for cat_id, stats in cat_stats.items():
-                cat_name = "Inconnu"
-                cat_color = "#CCCCCC"
-                if cat_id in cat_map:
-                    cat_name = cat_map[cat_id]["name"]
-                    cat_color = cat_map[cat_id]["color"]
+                cat = cat_map.get(cat_id)
+                cat_name = cat["name"] if cat else "Inconnu"
+                cat_color = cat["color"] if cat else "#CCCCCC"
                 
                 cat_names.append(cat_name)
                 durations.append(stats["duration"])
@@ -685,11 +702,6 @@ class MainWindow:
             return
         
         try:
-            # Get all activities
-            activities = self.db.get_activities()
-            categories = self.db.get_categories()
-            cat_map = {cat["id"]: cat for cat in categories}
-            
             # Write to CSV
             with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile)
@@ -697,19 +709,8 @@ class MainWindow:
                 # Write header
                 writer.writerow(['Date', 'Titre', 'Catégorie', 'Durée (min)', 'Notes'])
                 
-                # Write data
-                for act in activities:
-                    cat_name = "Inconnu"
-                    if act["category_id"] in cat_map:
-                        cat_name = cat_map[act["category_id"]]["name"]
-                    
-                    writer.writerow([
-                        act["date"],
-                        act["title"],
-                        cat_name,
-                        act["duration"],
-                        act.get("notes", "")
-                    ])
+                # Stream data rows, joined with their category names
+                writer.writerows(self.db.iter_activities_with_category())
             
             messagebox.showinfo("Exportation réussie", f"Les données ont été exportées vers {file_path}")
         
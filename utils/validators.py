@@ -6,10 +6,15 @@ Provides validation functions for user inputs
 import re
 from datetime import datetime
 
+# Patterns are compiled once at import
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+_SANITIZE_TABLE = str.maketrans('', '', '<>')
+
 def validate_date_format(date_str):
     """Validate date string format (YYYY-MM-DD)"""
-    pattern = r'^\d{4}-\d{2}-\d{2}$'
-    if not re.match(pattern, date_str):
+    if not _DATE_RE.match(date_str):
         return False
     
     try:
@@ -27,9 +32,9 @@ def validate_duration(duration):
         return False
 
 def validate_color_hex(color):
-    """Validate hex color code"""
-    pattern = r'^#(?:[0-9a-fA-F]{3}){1,2}$'
-    return bool(re.match(pattern, color))
+    """Validate hex color code (#RGB or #RRGGBB)"""
+    return (isinstance(color, str) and len(color) in (4, 7) and
+            color[0] == '#' and _HEX_DIGITS.issuperset(color[1:]))
 
 def sanitize_input(text):
     """Sanitize user input text"""
@@ -37,5 +42,5 @@ def sanitize_input(text):
         return ""
     
     # Remove potentially harmful characters
-    text = re.sub(r'[<>]', '', text)
+    text = text.translate(_SANITIZE_TABLE)
     return text.strip()
\ No newline at end of file